@@ -1,14 +1,25 @@
 import streamlit as st
-import json
 import hashlib
+import hmac
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import wraps
+from types import MappingProxyType
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 import altair as alt
 import gspread
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from google.oauth2.service_account import Credentials
 
 # --- CONFIGURATION ---
 SHEET_URL = st.secrets["private_gsheets_url"] # We will set this in Step 4
+MAX_RETRIES = 5 # Attempts per Sheets call before giving up on quota errors
+logger = logging.getLogger(__name__)
 
 TEMPLATES = {
     "Anterior A": ["Incline Chest Press (DB)", "Butterfly", "Lateral Raises (Cable)", "Overhead Extension", "Rope Pushdown", "Hack Squat", "Leg Extension", "Crunches"],
@@ -17,6 +28,15 @@ TEMPLATES = {
     "Posterior B": ["Lat Pulldown", "Seated Row", "T-Bar Row", "Incline Bi Curl", "Hammer Curl", "Reverse Curls", "Back Delts", "RDL", "Leg Curls"]
 }
 
+# Short calendar labels per template ("Anterior A" -> "Ant A")
+LABEL_MAP = {k: k.replace("Anterior", "Ant").replace("Posterior", "Post") for k in TEMPLATES}
+
+# Default exercise rows per template, built once and read-only since every session shares them
+TEMPLATE_EXERCISES = {
+    split: tuple(MappingProxyType({"name": n, "sets": 3, "reps": 10, "weight": 10.0}) for n in names)
+    for split, names in TEMPLATES.items()
+}
+
 # --- GOOGLE SHEETS CONNECTION ---
 # Cache the connection so we don't reconnect on every click
 @st.cache_resource
@@ -27,165 +47,324 @@ def get_gspread_client():
     creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
     return gspread.authorize(creds)
 
+# Opening the spreadsheet/tabs costs a metadata request, so reuse the handles too
+@st.cache_resource
 def get_db():
     client = get_gspread_client()
     return client.open_by_url(SHEET_URL)
 
+@st.cache_resource
+def _ws(name):
+    return get_db().worksheet(name)
+
+def with_backoff(fn):
+    """Retries a Sheets call on rate-limit (429) / unavailable (503) errors"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(MAX_RETRIES):
+            try:
+                return fn(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                if e.response.status_code not in (429, 503) or attempt == MAX_RETRIES - 1:
+                    raise
+                # Exponential backoff with jitter: ~1s, 2s, 4s, 8s
+                time.sleep(2 ** attempt + random.random())
+    return wrapper
+
+USER_COLUMNS = ["Username", "Password"]
+# One Logs row per exercise; a rest day is a single row with the exercise cells empty
+LOG_COLUMNS = ["Username", "Date", "Type", "Name", "Sets", "Reps", "Weight"]
+
+def _frame(rows, columns):
+    # Sheets drops trailing empty cells, so pad short rows back to full width
+    return pd.DataFrame([row + [""] * (len(columns) - len(row)) for row in rows], columns=columns)
+
+# The whole app reads from this one snapshot of both tabs (one values.batchGet),
+# cached between reruns. Every write below clears it so the next read sees the change.
+@st.cache_data(ttl=60, show_spinner=False)
+@with_backoff
+def snapshot():
+    """Returns (users_df, logs_df)"""
+    resp = get_db().values_batch_get(["Users!A2:B", "Logs!A1:G"], params={"valueRenderOption": "UNFORMATTED_VALUE"})
+    users, logs = (vr.get("values", []) for vr in resp["valueRanges"])
+    # An unmigrated tab would show its JSON blobs as exercise names and get new-layout rows mixed in
+    if logs and "Data" in logs[0]:
+        raise RuntimeError("The Logs tab still has the old JSON 'Data' column. Run migrate_logs.py first.")
+    return _frame(users, USER_COLUMNS), _frame(logs[1:], LOG_COLUMNS)
+
 # --- USER MANAGEMENT ---
-def hash_password(password):
-    return hashlib.sha256(str.encode(password)).hexdigest()
+PH = PasswordHasher() # argon2id; each hash embeds its own salt + parameters
 
-def get_all_users():
-    sh = get_db()
-    ws = sh.worksheet("Users")
-    records = ws.get_all_records() # Returns list of dicts: [{'Username': 'Ali', 'Password': '...'}, ...]
-    # Convert to simple dict {username: password_hash}
-    return {r['Username']: str(r['Password']) for r in records}
+def _legacy_sha256(password):
+    # Accounts created before argon2 stored an unsalted SHA-256 digest
+    return hashlib.sha256(password.encode("utf-8")).digest().hex()
+
+def get_password_hash(username):
+    """Stored hash for one user (None if they don't exist), without building a dict of everyone"""
+    users_df, _ = snapshot()
+    match = users_df.loc[users_df["Username"].astype(str) == username, "Password"]
+    return str(match.iat[0]) if len(match) else None
+
+# Backoff goes on the functions that make the Sheets call, not their callers:
+# snapshot() already retries, and nesting the two multiplies the attempts.
+@with_backoff
+def _append_user(username, password_hash):
+    _ws("Users").append_row([username, password_hash])
 
 def register_user(username, password):
-    users = get_all_users()
-    if username in users:
+    if get_password_hash(username) is not None:
         return False
     
-    sh = get_db()
-    ws = sh.worksheet("Users")
-    ws.append_row([username, hash_password(password)])
+    _append_user(username, PH.hash(password))
+    snapshot.clear()
     return True
 
+@with_backoff
+def _update_password_hash(username, password_hash):
+    ws = _ws("Users")
+    cell = ws.find(username, in_column=1)
+    if cell is None:
+        raise LookupError(f"User {username!r} not found in the Users tab")
+    ws.update_cell(cell.row, 2, password_hash)
+    snapshot.clear()
+
+def _upgrade_password_hash(username, password):
+    # Best-effort: the password is already verified, and the old hash stays
+    # in place on failure, so the upgrade is simply retried on the next login
+    try:
+        _update_password_hash(username, PH.hash(password))
+    except Exception:
+        logger.exception("Couldn't upgrade the password hash for %r", username)
+
 def authenticate(username, password):
-    users = get_all_users()
-    if username in users and users[username] == hash_password(password):
+    stored = get_password_hash(username)
+    if stored is None:
+        return False
+    
+    if not stored.startswith("$argon2"):
+        # Constant-time compare so response time doesn't leak matching prefixes
+        if not hmac.compare_digest(stored, _legacy_sha256(password)):
+            return False
+        _upgrade_password_hash(username, password) # Upgrade on first login
         return True
-    return False
+    
+    try:
+        PH.verify(stored, password)
+    except (VerificationError, InvalidHashError):
+        return False
+    if PH.check_needs_rehash(stored):
+        _upgrade_password_hash(username, password)
+    return True
 
 # --- HISTORY MANAGEMENT (READ/WRITE) ---
-def load_history_from_sheet():
-    """Loads ALL logs for ALL users (needed for leaderboard)"""
-    sh = get_db()
-    ws = sh.worksheet("Logs")
-    return ws.get_all_records()
+EXERCISE_FIELDS = {"Name": "name", "Sets": "sets", "Reps": "reps", "Weight": "weight"}
 
 def get_user_history(username):
     """Filters global history for specific user"""
-    all_logs = load_history_from_sheet()
+    _, logs = snapshot()
+    user_logs = logs[logs["Username"] == username].rename(columns=EXERCISE_FIELDS)
     user_history = {}
     
-    for row in all_logs:
-        if row['Username'] == username:
-            date_str = str(row['Date'])
-            try:
-                # The data column is stored as a JSON string
-                exercises = json.loads(row['Data'])
-                user_history[date_str] = {
-                    "type": row['Type'],
-                    "exercises": exercises
-                }
-            except:
-                continue # Skip corrupted rows
+    # Regroup the exercise rows into one log per date
+    for date_str, day in user_logs.groupby("Date", sort=False):
+        exercises = day.loc[day["name"] != "", list(EXERCISE_FIELDS.values())]
+        # Sheets hands back 10.0 as 10; keep weight a float so the editor allows 2.5 steps.
+        # A cleared cell reads back as "", so coerce sets/reps too or the column turns to text.
+        exercises = exercises.assign(
+            sets=pd.to_numeric(exercises["sets"], errors="coerce"),
+            reps=pd.to_numeric(exercises["reps"], errors="coerce"),
+            weight=pd.to_numeric(exercises["weight"], errors="coerce").astype(float),
+        )
+        user_history[str(date_str)] = {
+            "type": day["Type"].iat[0],
+            "exercises": exercises.to_dict("records")
+        }
     return user_history
 
+def _find_rows(ws, username, date_str):
+    """Returns the sheet rows holding a user's log for a date"""
+    # Only fetch Username + Date columns to find the rows (skips the header)
+    return [i for i, row in enumerate(ws.get("A2:B"), start=2) if row[:2] == [username, date_str]]
+
+def _delete_rows_requests(ws, rows):
+    # Bottom-up, so deleting one row doesn't shift the ones still to go
+    return [
+        {"deleteDimension": {"range": {"sheetId": ws.id, "dimension": "ROWS", "startIndex": row - 1, "endIndex": row}}}
+        for row in sorted(rows, reverse=True)
+    ]
+
+def _cell(value):
+    # stringValue is stored as-is (like RAW), so a cell starting with '=' is never run as a formula
+    if isinstance(value, str):
+        return {"userEnteredValue": {"stringValue": value}}
+    if pd.isna(value):
+        return {} # Cleared cell in the editor
+    return {"userEnteredValue": {"numberValue": float(value)}}
+
+def _append_rows_request(ws, rows):
+    values = [{"values": [_cell(v) for v in row]} for row in rows]
+    return {"appendCells": {"sheetId": ws.id, "rows": values, "fields": "userEnteredValue"}}
+
+def _log_rows(username, date_str, log_type, exercises):
+    if not exercises:
+        return [[username, date_str, log_type]]
+    return [[username, date_str, log_type, e["name"], e["sets"], e["reps"], e["weight"]] for e in exercises]
+
+@with_backoff
 def save_log_to_sheet(username, date_str, log_type, exercises):
-    sh = get_db()
-    ws = sh.worksheet("Logs")
-    
-    # 1. Check if log exists to update it (instead of duplicating)
-    cell = ws.find(username) # Optimization: Find user first
+    ws = _ws("Logs")
     
-    # Simple strategy: Delete old row for this date/user and append new one
-    # (Real databases do 'UPDATE', but this is safer for Sheets API)
+    # Simple strategy: Delete old rows for this date/user and append new ones
+    # (Real databases do 'UPDATE', but this is safer for Sheets API).
+    # Always look the rows up: the session's history can be stale, and a retried call must not append twice.
+    requests = _delete_rows_requests(ws, _find_rows(ws, username, date_str))
+    requests.append(_append_rows_request(ws, _log_rows(username, date_str, log_type, exercises)))
     
-    # Find all rows, identify index to delete
-    all_values = ws.get_all_values() # List of lists
-    row_to_delete = None
-    
-    # Skip header (index 0), start checking from index 1 (Row 2)
-    for i, row in enumerate(all_values[1:], start=2):
-        if row[0] == username and str(row[1]) == date_str:
-            row_to_delete = i
-            break
-            
-    if row_to_delete:
-        ws.delete_rows(row_to_delete)
-        
-    # Append new data
-    json_data = json.dumps(exercises)
-    ws.append_row([username, date_str, log_type, json_data])
+    # Delete + append go out as one atomic batchUpdate (single round-trip)
+    get_db().batch_update({"requests": requests})
+    snapshot.clear()
+    _leaderboard.clear()
 
+@with_backoff
 def delete_log_from_sheet(username, date_str):
-    sh = get_db()
-    ws = sh.worksheet("Logs")
-    all_values = ws.get_all_values()
-    
-    for i, row in enumerate(all_values[1:], start=2):
-        if row[0] == username and str(row[1]) == date_str:
-            ws.delete_rows(i)
-            return
+    ws = _ws("Logs")
+    rows = _find_rows(ws, username, date_str)
+    if rows:
+        get_db().batch_update({"requests": _delete_rows_requests(ws, rows)})
+        snapshot.clear()
+        _leaderboard.clear()
+
+# Sheets writes run off the script thread so the UI doesn't wait on Google.
+# Each session gets its own single worker: its writes stay in click order (e.g. save,
+# then delete) without one user's quota backoff holding up everyone else's saves.
+def _write_executor():
+    if "write_executor" not in st.session_state:
+        st.session_state.write_executor = ThreadPoolExecutor(max_workers=1)
+    return st.session_state.write_executor
+
+def _submit_write(fn, *args):
+    future = _write_executor().submit(fn, *args)
+    st.session_state.setdefault("pending_writes", []).append(future)
+
+def sync_status():
+    """Shows a badge while writes are in flight and reports any that failed"""
+    pending = []
+    for future in st.session_state.get("pending_writes", []):
+        if not future.done():
+            pending.append(future)
+        elif future.exception():
+            logger.error("Sheets write failed", exc_info=future.exception())
+            st.error("A change couldn't be saved to the cloud. Reloaded your log.")
+            st.session_state.hist_user = None # Re-read the sheet on the next load
+    st.session_state.pending_writes = pending
+    if pending:
+        st.caption("⏳ syncing…")
+
+# The session keeps its own copy of the user's history; writes update it in place
+def load_session_history(username):
+    if st.session_state.get("hist_user") != username:
+        wait(st.session_state.get("pending_writes", [])) # Don't read back a half-synced sheet
+        st.session_state.history = get_user_history(username)
+        st.session_state.hist_user = username
+    return st.session_state.history
+
+def save_log(username, date_str, log_type, exercises):
+    st.session_state.history[date_str] = {"type": log_type, "exercises": exercises}
+    _submit_write(save_log_to_sheet, username, date_str, log_type, exercises)
+
+def delete_log(username, date_str):
+    st.session_state.history.pop(date_str, None)
+    _submit_write(delete_log_from_sheet, username, date_str)
 
 # --- LEADERBOARD LOGIC ---
+LEADERBOARD_TTL = 300 # Seconds before the leaderboard is recomputed from the sheet
+
+# Persisted to disk so a cold container can show the login page without a Sheets call.
+# Disk caches ignore ttl, so the result carries its own timestamp (checked below);
+# saves/deletes in this process also clear it.
+@st.cache_data(persist="disk", show_spinner=False)
+def _leaderboard():
+    _, logs = snapshot()
+    # Each workout spans several exercise rows, so count distinct days
+    workouts = logs.loc[logs["Type"] != "Rest", ["Username", "Date"]].drop_duplicates()
+    counts = workouts.groupby("Username").size()
+    counts = counts.sort_values(ascending=False, kind="stable")
+    return time.time(), counts.reset_index(name="Days").rename(columns={"Username": "User"})
+
 def get_leaderboard_data():
-    all_logs = load_history_from_sheet()
-    user_counts = {}
-    
-    for row in all_logs:
-        u = row['Username']
-        t = row['Type']
-        if t != "Rest":
-            user_counts[u] = user_counts.get(u, 0) + 1
-            
-    leaderboard = [{"User": k, "Days": v} for k, v in user_counts.items()]
-    return sorted(leaderboard, key=lambda x: x["Days"], reverse=True)
+    computed_at, leaders = _leaderboard()
+    if time.time() - computed_at > LEADERBOARD_TTL:
+        _leaderboard.clear()
+        _, leaders = _leaderboard()
+    return leaders
 
 
-# --- VISUALIZATION (UNCHANGED) ---
-def plot_calendar(history):
-    today = datetime.now()
-    start_of_month = today.replace(day=1)
+# --- VISUALIZATION ---
+# The month grid only depends on the month, so it's built once per month
+@st.cache_data(show_spinner=False)
+def _month_days(year, month):
+    start_of_month = datetime(year, month, 1)
     next_month = (start_of_month.replace(day=28) + timedelta(days=4)).replace(day=1)
     end_of_month = next_month - timedelta(days=1)
     
     date_range = pd.date_range(start=start_of_month, end=end_of_month)
-    data = []
     
-    for d in date_range:
-        d_str = d.strftime("%Y-%m-%d")
-        day_log = history.get(d_str)
-        status = "Missed"
-        label = ""
-        if day_log:
-            if day_log["type"] == "Rest":
-                status = "Rest"; label = "💤"
-            else:
-                status = "Workout"; label = day_log["type"].replace("Anterior", "Ant").replace("Posterior", "Post")
-        data.append({"date": d, "day": d.day, "week": d.strftime("%U"), "weekday": d.strftime("%a"), "status": status, "label": label})
+    # Build the month column-wise instead of one dict per day
+    df = pd.DataFrame({"date": date_range})
+    df["day"] = df["date"].dt.day
+    df["week"] = df["date"].dt.strftime("%U")
+    df["weekday"] = df["date"].dt.strftime("%a")
+    # ISO date keys matching the history; the datetime64[D] cast skips strftime's locale path
+    df["key"] = df["date"].to_numpy().astype("datetime64[D]").astype(str)
+    return df
+
+# Chart specs are cached per month + logs shown, so reruns with unchanged data skip Altair.
+# The cache is shared by every session and each save adds a key, so cap it.
+@st.cache_data(max_entries=256, show_spinner=False)
+def _calendar_spec(year, month, month_logs):
+    """month_logs is a tuple of (date, type) pairs for the displayed month"""
+    df = _month_days(year, month)
+    log_type = df.pop("key").map(dict(month_logs))
+    df["status"] = np.where(log_type.isna(), "Missed", np.where(log_type == "Rest", "Rest", "Workout"))
+    # Types that aren't a current template (older/renamed splits, hand edits) keep their raw name
+    short_type = log_type.map(LABEL_MAP).fillna(log_type).fillna("")
+    df["label"] = np.where(df["status"] == "Rest", "💤", short_type)
         
-    base = alt.Chart(pd.DataFrame(data)).encode(x=alt.X("weekday:O", sort=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], title=None), y=alt.Y("week:O", axis=None, sort="descending"))
-    rects = base.mark_rect(stroke="white", strokeWidth=2).encode(color=alt.Color("status", scale=alt.Scale(domain=["Workout", "Rest", "Missed"], range=["#27ae60", "#2980b9", "#ecf0f1"]), legend=None))
-    text = base.mark_text(dx=-12, dy=-12, size=8, align='left').encode(text="day")
-    labels = base.mark_text(size=10, fontWeight="bold", color="white").encode(text="label")
-    st.altair_chart((rects + text + labels).properties(height=350, title=f"📅 {today.strftime('%B %Y')}"), use_container_width=True)
+    # x/y live once on the layer and are inherited by each mark, instead of repeated per layer
+    rects = alt.Chart().mark_rect(stroke="white", strokeWidth=2).encode(color=alt.Color("status", scale=alt.Scale(domain=["Workout", "Rest", "Missed"], range=["#27ae60", "#2980b9", "#ecf0f1"]), legend=None))
+    text = alt.Chart().mark_text(dx=-12, dy=-12, size=8, align='left').encode(text="day")
+    labels = alt.Chart().mark_text(size=10, fontWeight="bold", color="white").encode(text="label")
+    chart = alt.layer(rects, text, labels, data=df).encode(x=alt.X("weekday:O", sort=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], title=None), y=alt.Y("week:O", axis=None, sort="descending"))
+    return chart.properties(height=350, title=f"📅 {datetime(year, month, 1).strftime('%B %Y')}").to_dict()
+
+def plot_calendar(history):
+    today = datetime.now()
+    month_prefix = today.date().isoformat()[:8] # "YYYY-MM-"
+    month_logs = tuple(sorted((d, log["type"]) for d, log in history.items() if d.startswith(month_prefix)))
+    st.vega_lite_chart(_calendar_spec(today.year, today.month, month_logs), use_container_width=True)
+
+# Keyed on the user's whole history, so every save adds an entry: capped like the calendar's
+@st.cache_data(max_entries=256, show_spinner=False)
+def _consistency_spec(log_types):
+    """log_types is a tuple of (date, type) pairs; returns (spec, total_days)"""
+    dates, type_values = zip(*log_types)
+    # Each logged date is one distinct day, so every other day in the span was missed:
+    # the counts come straight from the entries without walking the span
+    idx = pd.to_datetime(list(dates), format="%Y-%m-%d", cache=True)
+    total_days = (idx.max() - idx.min()).days + 1
+    rest = type_values.count("Rest")
+    counts = {"Workouts": len(type_values) - rest, "Rest": rest, "Missed": total_days - len(type_values)}
+    source = pd.DataFrame({'Category': list(counts.keys()), 'Value': list(counts.values())})
+    chart = alt.Chart(source).mark_arc(innerRadius=60).encode(theta=alt.Theta("Value", stack=True), color=alt.Color("Category", scale=alt.Scale(domain=['Workouts', 'Rest', 'Missed'], range=['#27ae60', '#2980b9', '#bdc3c7'])), order=alt.Order("Value", sort="descending"))
+    return chart.to_dict(), total_days
 
 def plot_consistency(history):
     if not history:
         st.info("Start working out to see your chart!")
         return
-    dates = sorted(history.keys())
-    start_date = datetime.strptime(dates[0], "%Y-%m-%d")
-    end_date = datetime.strptime(dates[-1], "%Y-%m-%d")
-    total_days = (end_date - start_date).days + 1
-    counts = {"Workouts": 0, "Rest": 0, "Missed": 0}
-    current = start_date
-    while current <= end_date:
-        d_s = current.strftime("%Y-%m-%d")
-        l = history.get(d_s)
-        if l:
-            if l["type"] == "Rest": counts["Rest"] += 1
-            else: counts["Workouts"] += 1
-        else:
-            counts["Missed"] += 1
-        current += timedelta(days=1)
-    source = pd.DataFrame({'Category': list(counts.keys()), 'Value': list(counts.values())})
-    chart = alt.Chart(source).mark_arc(innerRadius=60).encode(theta=alt.Theta("Value", stack=True), color=alt.Color("Category", scale=alt.Scale(domain=['Workouts', 'Rest', 'Missed'], range=['#27ae60', '#2980b9', '#bdc3c7'])), order=alt.Order("Value", sort="descending"))
-    st.altair_chart(chart, use_container_width=True)
+    log_types = tuple(sorted((d, log["type"]) for d, log in history.items()))
+    spec, total_days = _consistency_spec(log_types)
+    st.vega_lite_chart(spec, use_container_width=True)
     st.caption(f"Tracking {total_days} days")
 
 
@@ -202,10 +381,9 @@ if not st.session_state.logged_in:
     st.subheader("🏆 Leaderboard")
     try:
         leader_data = get_leaderboard_data()
-        if leader_data:
-            df_leader = pd.DataFrame(leader_data)
-            df_leader.index = df_leader.index + 1
-            st.dataframe(df_leader, use_container_width=True)
+        if not leader_data.empty:
+            leader_data.index = leader_data.index + 1
+            st.dataframe(leader_data, use_container_width=True)
     except Exception as e:
         st.warning("Could not load leaderboard. Check DB connection.")
 
@@ -224,23 +402,26 @@ if not st.session_state.logged_in:
                 st.error("Invalid")
     with tab2:
         nu = st.text_input("New User", key="n_u")
-        np = st.text_input("New Pass", type="password", key="n_p")
+        npw = st.text_input("New Pass", type="password", key="n_p")
         if st.button("Create Account"):
-            if register_user(nu, np):
+            if register_user(nu, npw):
                 st.success("Created! Login now.")
             else:
                 st.error("User exists.")
 
 else:
     user = st.session_state.username
-    # Load data freshly from Google Sheets
-    history = get_user_history(user)
+    sync_status()
+    # Loaded from Google Sheets once per login, then kept in session state
+    history = load_session_history(user)
     
     c1, c2 = st.columns([3, 1])
     with c1: st.title(f"🏋️ {user}")
     with c2: 
         if st.button("Logout"):
             st.session_state.logged_in = False
+            st.session_state.pop("history", None)
+            st.session_state.pop("hist_user", None)
             st.rerun()
 
     plot_calendar(history)
@@ -250,36 +431,39 @@ else:
     with c1:
         st.write("### 📝 Edit Log")
         sel_date = st.date_input("Date", datetime.now(), label_visibility="collapsed")
-        d_str = sel_date.strftime("%Y-%m-%d")
+        d_str = sel_date.isoformat()
 
     log = history.get(d_str)
 
     if not log:
         if st.button("💤 Mark Rest"):
-            save_log_to_sheet(user, d_str, "Rest", [])
+            save_log(user, d_str, "Rest", [])
             st.rerun()
         st.write("Or Workout:")
         cols = st.columns(2)
         for i, split in enumerate(TEMPLATES.keys()):
             with cols[i % 2]:
                 if st.button(f"💪 {split}", use_container_width=True):
-                    exs = [{"name": n, "sets": 3, "reps": 10, "weight": 10.0} for n in TEMPLATES[split]]
-                    save_log_to_sheet(user, d_str, split, exs)
+                    save_log(user, d_str, split, TEMPLATE_EXERCISES[split])
                     st.rerun()
     elif log["type"] == "Rest":
         st.info("Rest Day")
         if st.button("Delete"):
-            delete_log_from_sheet(user, d_str)
+            delete_log(user, d_str)
             st.rerun()
     else:
         st.success(f"✅ {log['type']}")
-        df = pd.DataFrame(log['exercises'])
-        edited = st.data_editor(df, hide_index=True, use_container_width=True)
-        if st.button("💾 Save"):
-            save_log_to_sheet(user, d_str, log['type'], edited.to_dict('records'))
-            st.toast("Saved to Cloud!")
-        if st.button("Delete"):
-            delete_log_from_sheet(user, d_str)
+        df = pd.DataFrame(log['exercises'], columns=list(EXERCISE_FIELDS.values()))
+        # Inside a form, cell edits don't rerun the script until Save/Delete is pressed
+        with st.form(f"edit_{d_str}"):
+            edited = st.data_editor(df, hide_index=True, use_container_width=True)
+            save = st.form_submit_button("💾 Save")
+            delete = st.form_submit_button("Delete")
+        if save:
+            save_log(user, d_str, log['type'], edited.to_dict('records'))
+            st.toast("Saving…")
+        if delete:
+            delete_log(user, d_str)
             st.rerun()
 
     st.divider()
@@ -0,0 +1,59 @@
+"""One-off migration of the Logs tab to one row per exercise.
+
+Older versions of the app stored each day as a single row with the
+exercises JSON-encoded in a "Data" column. The app now reads
+Username, Date, Type, Name, Sets, Reps, Weight with one row per exercise
+(a rest day is a single row with the exercise cells empty).
+
+Run once, from the app folder so .streamlit/secrets.toml is picked up:
+    python migrate_logs.py
+The old tab is kept as "Logs (JSON backup)". Restart the app afterwards:
+it caches the worksheet handle, which would still point at the old tab.
+"""
+import json
+import streamlit as st
+import gspread
+from google.oauth2.service_account import Credentials
+
+NEW_HEADER = ["Username", "Date", "Type", "Name", "Sets", "Reps", "Weight"]
+
+def explode_row(record):
+    base = [str(record["Username"]), str(record["Date"]), record["Type"]]
+    exercises = json.loads(record["Data"]) if record["Data"] else []
+    if not exercises:
+        return [base]
+    return [base + [e.get("name", ""), e.get("sets", ""), e.get("reps", ""), e.get("weight", "")] for e in exercises]
+
+def rename_request(ws, title):
+    return {"updateSheetProperties": {"properties": {"sheetId": ws.id, "title": title}, "fields": "title"}}
+
+def main():
+    creds_dict = dict(st.secrets["gcp_service_account"])
+    scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+    creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
+    sh = gspread.authorize(creds).open_by_url(st.secrets["private_gsheets_url"])
+
+    old = sh.worksheet("Logs")
+    # get_all_values keeps cells as text; get_all_records would turn a username like "007" into 7
+    header, *values = old.get_all_values()
+    if "Data" not in header:
+        print("Logs tab is already migrated.")
+        return
+    records = [dict(zip(header, row)) for row in values]
+
+    rows = []
+    for i, record in enumerate(records, start=2):
+        try:
+            rows.extend(explode_row(record))
+        except (TypeError, ValueError, AttributeError): # AttributeError: an exercise that isn't a dict
+            print(f"Skipping corrupted row {i}")
+
+    # Write the new tab in full under a temporary name, then swap both titles in a
+    # single batchUpdate so the app never sees a missing or half-written Logs tab
+    new = sh.add_worksheet("Logs (migrating)", rows=len(rows) + 1, cols=len(NEW_HEADER))
+    new.update(values=[NEW_HEADER] + rows, range_name="A1", value_input_option="RAW")
+    sh.batch_update({"requests": [rename_request(old, "Logs (JSON backup)"), rename_request(new, "Logs")]})
+    print(f"Migrated {len(records)} logs into {len(rows)} rows.")
+
+if __name__ == "__main__":
+    main()